@@ -1,16 +1,27 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from fredapi import Fred
-import wbdata
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 import yfinance as yf
 import sqlite3
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, Future
+import threading
 import plotly.express as px
 import re
 import json
+import hashlib
+import tempfile
+import os
+import sys
+import argparse
+import logging
+import io
+import time
+from contextlib import closing
+from urllib.parse import urlparse
+from datetime import datetime, timedelta
 
 def replace_nan_with_none(obj):
     if isinstance(obj, list):
@@ -22,106 +33,189 @@ def replace_nan_with_none(obj):
     else:
         return obj
 
+log = logging.getLogger('econ')
+
 # Get key from st.secrets
 fred_api_key = st.secrets['FRED_API_KEY']
-fred = Fred(api_key=fred_api_key)
 
-# Indicators list with fetch (returns [previous, current, forecast]), thresh, desc, unit
+# Derived metrics: inputs (FRED ids, 'wb:<indicator>:<country>' World Bank keys, 'scrape:<name>' scraped values or other metrics) + transform, evaluated over whole histories
+# Optional freq resamples every input to that frequency (last value per period) before the transform
+metrics = {
+    'inflation_yoy': {'inputs': ['CPIAUCSL'], 'transform': 'pct_change', 'periods': 12},
+    'payrolls_change': {'inputs': ['PAYEMS'], 'transform': 'change', 'periods': 1},
+    'credit_change': {'inputs': ['TOTALSL'], 'transform': 'change', 'periods': 12},
+    'real_rate': {'inputs': ['FEDFUNDS', 'inflation_yoy'], 'transform': 'diff', 'freq': 'MS'},
+    'debt_bn': {'inputs': ['GFDEBTN'], 'transform': 'level', 'scale': 0.001},  # GFDEBTN is in millions, GDP in billions
+    'debt_to_gdp': {'inputs': ['debt_bn', 'GDP'], 'transform': 'ratio', 'scale': 100, 'freq': 'QS'},
+    'debt_to_gdp_fall': {'inputs': ['debt_to_gdp'], 'transform': 'pct_change', 'periods': 4, 'scale': -100},
+    'debt_minus_gdp': {'inputs': ['debt_bn', 'GDP'], 'transform': 'diff', 'freq': 'QS'},
+    'debt_change': {'inputs': ['GFDEBTN'], 'transform': 'change', 'periods': 4},
+    'gdp_change': {'inputs': ['GDP'], 'transform': 'change', 'periods': 4},
+    'gdp_share': {'inputs': ['wb:NY.GDP.MKTP.CD:US', 'wb:NY.GDP.MKTP.CD:WLD'], 'transform': 'ratio', 'scale': 100},
+}
+
+transforms = {
+    'level': lambda x, scale=1: x * scale,
+    'ratio': lambda a, b, scale=1: a / b * scale,
+    'diff': lambda a, b, scale=1: (a - b) * scale,
+    'change': lambda x, periods=1, scale=1: (x - x.shift(periods)) * scale,
+    'pct_change': lambda x, periods=1, scale=100: x.pct_change(periods) * scale,
+}
+
+# Indicators list with metric (series key or derived metric) sampled at observation offsets 'at' (NaN without enough history),
+# or a fetch func for static values (returns [previous, current, forecast]), release (refresh schedule), thresh, desc, unit
 indicators = {
-    'Yield Curve': {'func': lambda: [fred.get_series('T10Y2Y').iloc[-12] if fred else 0.48, fred.get_series('T10Y2Y').iloc[-1] if fred else 0.49, np.nan], 'thresh': '10Y-2Y > 1% (steep), < 0 (inversion), < 0.5% (flattening)', 'desc': 'Yield curve', 'unit': '%'},
-    'Consumer Confidence': {'func': lambda: [fred.get_series('UMCSENT').iloc[-12] if fred else 68.2, fred.get_series('UMCSENT').iloc[-1] if fred else 52.2, np.nan], 'thresh': '> 90 index (rising), < 85 (declining)', 'desc': 'Consumer confidence', 'unit': 'Index'},
-    'Building Permits': {'func': lambda: [fred.get_series('PERMIT').iloc[-12] if fred else 1436, fred.get_series('PERMIT').iloc[-1] if fred else 1397, np.nan], 'thresh': '+5% YoY (increasing)', 'desc': 'Building permits', 'unit': 'Thousands'},
-    'Unemployment Claims': {'func': lambda: [fred.get_series('ICSA').iloc[-12] if fred else 241000, fred.get_series('ICSA').iloc[-1] if fred else 221000, np.nan], 'thresh': '-10% YoY (falling), +10% YoY (rising)', 'desc': 'Unemployment claims', 'unit': 'Thousands'},
-    'LEI': {'func': lambda: [fred.get_series('USSLIND').iloc[-12] if fred else 1.2, fred.get_series('USSLIND').iloc[-1] if fred else 1.72, np.nan], 'thresh': '+1–2% (positive), -1%+ (falling)', 'desc': 'LEI (Conference Board Leading Economic Index)', 'unit': 'Index'},
-    'GDP': {'func': lambda: [fred.get_series('GDP').iloc[-4] if fred else 25805.791, fred.get_series('GDP').iloc[-1] if fred else 29962.047, 31000], 'thresh': 'Above potential (1–2% gap), contracting (negative YoY), bottoming near 0%', 'desc': 'GDP', 'unit': 'Billion $'},
-    'Capacity Utilization': {'func': lambda: [fred.get_series('CAPUTLB50001S').iloc[-12] if fred else 77.5, fred.get_series('CAPUTLB50001S').iloc[-1] if fred else 78.0, np.nan], 'thresh': '75–80% (normal), >80% (high), <70% (low)', 'desc': 'Capacity utilization', 'unit': '%'},
-    'Inflation': {'func': lambda: [(fred.get_series('CPIAUCSL').iloc[-12] - fred.get_series('CPIAUCSL').iloc[-24]) / fred.get_series('CPIAUCSL').iloc[-24] * 100 if fred else 3.0, (fred.get_series('CPIAUCSL').iloc[-1] - fred.get_series('CPIAUCSL').iloc[-12]) / fred.get_series('CPIAUCSL').iloc[-12] * 100 if fred else 2.7, 2.5], 'thresh': '2–3% (moderate), >3% (accelerating), <1% (falling)', 'desc': 'Inflation', 'unit': '%'},
-    'Retail Sales': {'func': lambda: [fred.get_series('RSXFS').iloc[-12] if fred else 606077, fred.get_series('RSXFS').iloc[-1] if fred else 621370, np.nan], 'thresh': '+3–5% YoY (rising), <1% YoY (slowdown), -1% YoY (decline)', 'desc': 'Retail sales', 'unit': '%'},
-    'Nonfarm Payrolls': {'func': lambda: [fred.get_series('PAYEMS').iloc[-13] - fred.get_series('PAYEMS').iloc[-14] if fred else 87, fred.get_series('PAYEMS').iloc[-2] - fred.get_series('PAYEMS').iloc[-3] if fred else 144, np.nan], 'thresh': '+150K/month (steady growth)', 'desc': 'Nonfarm payrolls', 'unit': 'Thousands'},
-    'Wage Growth': {'func': lambda: [fred.get_series('AHETPI').iloc[-12] if fred else 118456.2876, fred.get_series('AHETPI').iloc[-1] if fred else 120867.2759, np.nan], 'thresh': '>3% YoY (rising)', 'desc': 'Wage growth', 'unit': '%'},
-    'P/E Ratios': {'func': lambda: [scrape_multpl_pe() - 0.83 or 29.67, scrape_multpl_pe() or 30.50, np.nan], 'thresh': '20+ (high), 25+ (bubble signs)', 'desc': 'P/E ratios', 'unit': 'Ratio'},
-    'Credit Growth': {'func': lambda: [fred.get_series('TOTALSL').iloc[-12] - fred.get_series('TOTALSL').iloc[-24] if fred else 118456.2876, fred.get_series('TOTALSL').iloc[-1] - fred.get_series('TOTALSL').iloc[-13] if fred else 120867.2759, np.nan], 'thresh': '>5% YoY (increasing), slowing (below trend)', 'desc': 'Credit growth', 'unit': '%'},
-    'Fed Funds Futures': {'func': lambda: [np.nan, scrape_fed_rates() or 4.33, np.nan], 'thresh': 'Implying hikes (+0.5%+)', 'desc': 'Fed funds futures', 'unit': '%'},
-    'Short Rates': {'func': lambda: [fred.get_series('FEDFUNDS').iloc[-12] if fred else 5.25, fred.get_series('FEDFUNDS').iloc[-1] if fred else 4.33, np.nan], 'thresh': 'Rising during tightening', 'desc': 'Short rates', 'unit': '%'},
-    'Industrial Production': {'func': lambda: [fred.get_series('INDPRO').iloc[-12] if fred else 103.2, fred.get_series('INDPRO').iloc[-1] if fred else 103.7, np.nan], 'thresh': '+2–5% YoY (rising), -2% YoY (falling)', 'desc': 'Industrial production', 'unit': 'Index'},
-    'Consumer/Investment Spending': {'func': lambda: [fred.get_series('PCE').iloc[-12] if fred else 18645.2, fred.get_series('PCE').iloc[-1] if fred else 19234.5, np.nan], 'thresh': 'Balanced or dropping during recession', 'desc': 'Consumer/investment spending', 'unit': 'Billion $'},
-    'Productivity Growth': {'func': lambda: [fred.get_series('OPHNFB').iloc[-4] if fred else 118.3, fred.get_series('OPHNFB').iloc[-1] if fred else 119.7, np.nan], 'thresh': '>3% YoY (rising), +2% YoY (rebound)', 'desc': 'Productivity growth', 'unit': '%'},
-    'Debt-to-GDP': {'func': lambda: [ (fred.get_series('GFDEBTN').iloc[-12] / fred.get_series('GDP').iloc[-12]) * 100 if fred else 120.83, (fred.get_series('GFDEBTN').iloc[-1] / fred.get_series('GDP').iloc[-1]) * 100 if fred else 120.87, np.nan], 'thresh': '<60% (low), >100% (high), >120% (crisis)', 'desc': 'Debt-to-GDP', 'unit': '%'},
-    'Foreign Reserves': {'func': lambda: [fred.get_series('TRESEGT').iloc[-12] if fred else 233.5, fred.get_series('TRESEGT').iloc[-1] if fred else 237.745, np.nan], 'thresh': '+10% YoY (increasing), -10% YoY (falling)', 'desc': 'Foreign reserves', 'unit': 'Billion $'},
-    'Real Rates': {'func': lambda: [fred.get_series('FEDFUNDS').iloc[-12] - fred.get_series('CPIAUCSL').iloc[-12] if fred else 2.1, fred.get_series('FEDFUNDS').iloc[-1] - fred.get_series('CPIAUCSL').iloc[-1] if fred else -1.26, np.nan], 'thresh': '< -1% (low), >0% (positive)', 'desc': 'Real rates', 'unit': '%'},
-    'Trade Balance': {'func': lambda: [fred.get_series('NETEXP').iloc[-4] if fred else -2.9, fred.get_series('NETEXP').iloc[-1] if fred else -3.1, np.nan], 'thresh': 'Surplus >2% GDP (improving)', 'desc': 'Trade balance', 'unit': '%'},
-    'Debt Growth > Incomes': {'func': lambda: [fred.get_series('GFDEBTN').iloc[-4] - fred.get_series('GDP').iloc[-4] if fred else 34586.533 - 28624.069, fred.get_series('GFDEBTN').iloc[-1] - fred.get_series('GDP').iloc[-1] if fred else 36214.310 - 29962.047, np.nan], 'thresh': '> incomes (+5–10% YoY gap)', 'desc': 'Debt growth > incomes', 'unit': '%'},
-    'Asset Prices > Traditional Metrics': {'func': lambda: [scrape_multpl_pe() - 0.83 or 29.67, scrape_multpl_pe() or 30.50, np.nan], 'thresh': 'P/E +20% or >20', 'desc': 'Asset prices > traditional metrics', 'unit': 'Ratio'},
-    'Wealth Gaps': {'func': lambda: (series := wbdata.get_series('SI.POV.GINI', country='US')) and [series.iloc[-2] if len(series) >1 else 41.7, series.iloc[-1] if not series.empty else 41.8, np.nan] or [41.7, 41.8, np.nan], 'thresh': 'Top 1% share +5%, >40% (wide)', 'desc': 'Wealth gaps', 'unit': 'Index'},
-    'Credit Spreads': {'func': lambda: [fred.get_series('BAAFF').iloc[-12] if fred else 4.5, fred.get_series('BAAFF').iloc[-1] if fred else 4.8, np.nan], 'thresh': '>500 bps (widening)', 'desc': 'Credit spreads', 'unit': '%'},
-    'Central Bank Printing (M2)': {'func': lambda: [fred.get_series('M2SL').iloc[-12] if fred else 20900, fred.get_series('M2SL').iloc[-1] if fred else 21940, np.nan], 'thresh': '+10% YoY (significant printing)', 'desc': 'Central bank printing (M2)', 'unit': 'Billion $'},
-    'Currency Devaluation': {'func': lambda: [fred.get_series('EXUSUK').iloc[-12] if fred else 1.27, fred.get_series('EXUSUK').iloc[-1] if fred else 1.27, np.nan], 'thresh': '-10% to -20%', 'desc': 'Currency devaluation', 'unit': 'Rate'},
-    'Fiscal Deficits': {'func': lambda: [fred.get_series('MTSDS133FMS').iloc[-12] if fred else -6.1, fred.get_series('MTSDS133FMS').iloc[-1] if fred else -6.3, np.nan], 'thresh': '>6% GDP', 'desc': 'Fiscal deficits', 'unit': '%'},
-    'Debt-to-GDP Falling (-5% YoY)': {'func': lambda: [((fred.get_series('GFDEBTN').iloc[-24] / fred.get_series('GDP').iloc[-24]) * 100 - (fred.get_series('GFDEBTN').iloc[-12] / fred.get_series('GDP').iloc[-12]) * 100) / (fred.get_series('GFDEBTN').iloc[-24] / fred.get_series('GDP').iloc[-24]) * 100 if fred else -0.98, ((fred.get_series('GFDEBTN').iloc[-12] / fred.get_series('GDP').iloc[-12]) * 100 - (fred.get_series('GFDEBTN').iloc[-1] / fred.get_series('GDP').iloc[-1]) * 100) / (fred.get_series('GFDEBTN').iloc[-12] / fred.get_series('GDP').iloc[-12]) * 100 if fred else -0.05, np.nan], 'thresh': 'Debt-to-GDP Falling (-5% YoY)', 'desc': 'Debt-to-GDP falling', 'unit': '%'},
-    'Debt Growth': {'func': lambda: [fred.get_series('GFDEBTN').iloc[-12] - fred.get_series('GFDEBTN').iloc[-24] if fred else 34586533 - 33123456, fred.get_series('GFDEBTN').iloc[-1] - fred.get_series('GFDEBTN').iloc[-12] if fred else 36214310 - 34586533, np.nan], 'thresh': '> incomes (+5–10% YoY gap)', 'desc': 'Debt growth', 'unit': 'Million $'},
-    'Income Growth': {'func': lambda: [fred.get_series('GDP').iloc[-12] - fred.get_series('GDP').iloc[-24] if fred else 28624.069 - 27234.567, fred.get_series('GDP').iloc[-1] - fred.get_series('GDP').iloc[-12] if fred else 29962.047 - 28624.069, np.nan], 'thresh': 'Must match or exceed debt growth', 'desc': 'Income growth', 'unit': 'Billion $'},
-    'Debt Service': {'func': lambda: [fred.get_series('FGDS').iloc[-12] if fred else 987, fred.get_series('FGDS').iloc[-1] if fred else 1013, np.nan], 'thresh': '>20% incomes (high burden)', 'desc': 'Debt service', 'unit': 'Billion $'},
-    'Education Investment': {'func': lambda: (series := wbdata.get_series('SE.XPD.TOTL.GD.ZS', country='US')) and [series.iloc[-2] if len(series) >1 else 5.4, series.iloc[-1] if not series.empty else 5.44, np.nan] or [5.4, 5.44, np.nan], 'thresh': '+5% budget YoY (rising)', 'desc': 'Education investment', 'unit': '%'},
-    'R&D Patents': {'func': lambda: (series := wbdata.get_series('IP.PAT.RESD', country='US')) and [series.iloc[-2] if len(series) >1 else 272491, series.iloc[-1] if not series.empty else 273491, np.nan] or [272491, 273491, np.nan], 'thresh': '+10% YoY (rising)', 'desc': 'R&D patents', 'unit': 'Count'},
-    'Competitiveness Index (WEF)': {'func': lambda: [np.nan, scrape_wef_competitiveness() or 85.6, np.nan], 'thresh': 'Improving +5 ranks, strong rank (top 10)', 'desc': 'Competitiveness index (WEF)', 'unit': 'Score (0-100)'},
-    'GDP per Capita Growth': {'func': lambda: (series := wbdata.get_series('NY.GDP.PCAP.KD.ZG', country='US')) and [series.iloc[-2] if len(series) >1 else 0.7974, series.iloc[-1] if not series.empty else -1.0, np.nan] or [0.7974, -1.0, np.nan], 'thresh': '+3% YoY (accelerating)', 'desc': 'GDP per capita growth', 'unit': '%'},
-    'Trade Share': {'func': lambda: (series := wbdata.get_series('NE.TRD.GNFS.ZS', country='US')) and [series.iloc[-2] if len(series) >1 else 23.89, series.iloc[-1] if not series.empty else 24.89, np.nan] or [23.89, 24.89, np.nan], 'thresh': '+2% global (expanding)', 'desc': 'Trade share', 'unit': '%'},
-    'Military Spending': {'func': lambda: [scrape_sipri_military() - 0.5 or 2.8, scrape_sipri_military() or 3.3, np.nan], 'thresh': '>3–4% GDP (peaking)', 'desc': 'Military spending', 'unit': '%'},
-    'Internal Conflicts': {'func': lambda: [scrape_conflicts_index() - 5 or 29500, scrape_conflicts_index() or 30000, np.nan], 'thresh': 'Protests +20% (rising)', 'desc': 'Internal conflicts', 'unit': 'Count'},
-    'Reserve Currency Usage Dropping': {'func': lambda: [scrape_reserve_currency_share() - 5 or 53, scrape_reserve_currency_share() or 58, np.nan], 'thresh': '-5% global', 'desc': 'Reserve currency usage dropping', 'unit': '%'},
-    'Military Losses': {'func': lambda: [scrape_military_losses() - 1 or 0, scrape_military_losses() or 1, np.nan], 'thresh': 'Defeats +1/year (increasing)', 'desc': 'Military losses', 'unit': 'Count'},
-    'Economic Output Share': {'func': lambda: (us_gdp := wbdata.get_series('NY.GDP.MKTP.CD', country='US')) and (wld_gdp := wbdata.get_series('NY.GDP.MKTP.CD', country='WLD')) and [eos - 1 if pd.notna(eos := us_gdp.iloc[-1] / wld_gdp.iloc[-1] * 100 if not us_gdp.empty and not wld_gdp.empty else np.nan) else 13.75, eos if pd.notna(eos) else 14.75, np.nan] or [13.75, 14.75, np.nan], 'thresh': '-2% global (falling), <10% (shrinking)', 'desc': 'Economic output share', 'unit': '%'},
-    'Corruption Index': {'func': lambda: [np.nan, scrape_transparency_cpi() or 65, np.nan], 'thresh': 'Worsening -10 points, index >50 (high corruption)', 'desc': 'Corruption index', 'unit': 'Score (0-100)'},
-    'Working Population': {'func': lambda: [fred.get_series('LFWA64TTUSM647S').iloc[-12] if fred else 169700, fred.get_series('LFWA64TTUSM647S').iloc[-1] if fred else 170700, np.nan], 'thresh': '-1% YoY (declining)', 'desc': 'Working population', 'unit': 'Thousands'},
-    'Education (PISA Scores)': {'func': lambda: [np.nan, 489, np.nan], 'thresh': '>500 (top scores)', 'desc': 'Education (PISA scores)', 'unit': 'Score (0-1000)'},
-    'Innovation': {'func': lambda: (series := wbdata.get_series('IP.PAT.RESD', country='US')) and [series.iloc[-2] if len(series) >1 else 272491, series.iloc[-1] if not series.empty else 273491, np.nan] or [272491, 273491, np.nan], 'thresh': 'Patents >20% global (high)', 'desc': 'Innovation', 'unit': 'Count'},
-    'GDP Share': {'func': lambda: (us_gdp := wbdata.get_series('NY.GDP.MKTP.CD', country='US')) and (wld_gdp := wbdata.get_series('NY.GDP.MKTP.CD', country='WLD')) and [gs - 1 if pd.notna(gs := us_gdp.iloc[-1] / wld_gdp.iloc[-1] * 100 if not us_gdp.empty and not wld_gdp.empty else np.nan) else 13.75, gs if pd.notna(gs) else 14.75, np.nan] or [13.75, 14.75, np.nan], 'thresh': '10–20% (growing), <10% (shrinking)', 'desc': 'GDP share', 'unit': '%'},
-    'Trade Dominance': {'func': lambda: (series := wbdata.get_series('NE.TRD.GNFS.ZS', country='US')) and [series.iloc[-2] if len(series) >1 else 23.89, series.iloc[-1] if not series.empty else 24.89, np.nan] or [23.89, 24.89, np.nan], 'thresh': '>15% global (dominant)', 'desc': 'Trade dominance', 'unit': '%'},
-    'Power Index': {'func': lambda: [scrape_globalfirepower_index() + 0.01 or 0.0844, scrape_globalfirepower_index() or 0.0744, np.nan], 'thresh': '8–10/10 (peak), <7/10 (declining)', 'desc': 'Power index', 'unit': 'Index'},
-    'Debt Burden': {'func': lambda: [(fred.get_series('GFDEBTN').iloc[-12] / fred.get_series('GDP').iloc[-12]) * 100 if fred else 121.85, (fred.get_series('GFDEBTN').iloc[-1] / fred.get_series('GDP').iloc[-1]) * 100 if fred else 120.87, np.nan], 'thresh': '>100% GDP (high), rising fast (+20% in 3 years)', 'desc': 'Debt burden', 'unit': '%'},
+    'Yield Curve': {'metric': 'T10Y2Y', 'at': (-12, -1), 'release': 'daily', 'thresh': '10Y-2Y > 1% (steep), < 0 (inversion), < 0.5% (flattening)', 'desc': 'Yield curve', 'unit': '%'},
+    'Consumer Confidence': {'metric': 'UMCSENT', 'at': (-12, -1), 'release': 'monthly', 'thresh': '> 90 index (rising), < 85 (declining)', 'desc': 'Consumer confidence', 'unit': 'Index'},
+    'Building Permits': {'metric': 'PERMIT', 'at': (-12, -1), 'release': 'monthly', 'thresh': '+5% YoY (increasing)', 'desc': 'Building permits', 'unit': 'Thousands'},
+    'Unemployment Claims': {'metric': 'ICSA', 'at': (-12, -1), 'release': 'weekly', 'thresh': '-10% YoY (falling), +10% YoY (rising)', 'desc': 'Unemployment claims', 'unit': 'Thousands'},
+    'LEI': {'metric': 'USSLIND', 'at': (-12, -1), 'release': 'monthly', 'thresh': '+1–2% (positive), -1%+ (falling)', 'desc': 'LEI (Conference Board Leading Economic Index)', 'unit': 'Index'},
+    'GDP': {'metric': 'GDP', 'at': (-4, -1), 'forecast': 31000, 'release': 'quarterly', 'thresh': 'Above potential (1–2% gap), contracting (negative YoY), bottoming near 0%', 'desc': 'GDP', 'unit': 'Billion $'},
+    'Capacity Utilization': {'metric': 'CAPUTLB50001S', 'at': (-12, -1), 'release': 'monthly', 'thresh': '75–80% (normal), >80% (high), <70% (low)', 'desc': 'Capacity utilization', 'unit': '%'},
+    'Inflation': {'metric': 'inflation_yoy', 'at': (-12, -1), 'forecast': 2.5, 'release': 'monthly', 'thresh': '2–3% (moderate), >3% (accelerating), <1% (falling)', 'desc': 'Inflation', 'unit': '%'},
+    'Retail Sales': {'metric': 'RSXFS', 'at': (-12, -1), 'release': 'monthly', 'thresh': '+3–5% YoY (rising), <1% YoY (slowdown), -1% YoY (decline)', 'desc': 'Retail sales', 'unit': '%'},
+    'Nonfarm Payrolls': {'metric': 'payrolls_change', 'at': (-13, -2), 'release': 'monthly', 'thresh': '+150K/month (steady growth)', 'desc': 'Nonfarm payrolls', 'unit': 'Thousands'},
+    'Wage Growth': {'metric': 'AHETPI', 'at': (-12, -1), 'release': 'monthly', 'thresh': '>3% YoY (rising)', 'desc': 'Wage growth', 'unit': '%'},
+    'P/E Ratios': {'metric': 'scrape:multpl_pe', 'at': (-2, -1), 'release': 'daily', 'thresh': '20+ (high), 25+ (bubble signs)', 'desc': 'P/E ratios', 'unit': 'Ratio'},
+    'Credit Growth': {'metric': 'credit_change', 'at': (-12, -1), 'release': 'monthly', 'thresh': '>5% YoY (increasing), slowing (below trend)', 'desc': 'Credit growth', 'unit': '%'},
+    'Fed Funds Futures': {'metric': 'scrape:fed_rates', 'at': (-2, -1), 'release': 'daily', 'thresh': 'Implying hikes (+0.5%+)', 'desc': 'Fed funds futures', 'unit': '%'},
+    'Short Rates': {'metric': 'FEDFUNDS', 'at': (-12, -1), 'release': 'monthly', 'thresh': 'Rising during tightening', 'desc': 'Short rates', 'unit': '%'},
+    'Industrial Production': {'metric': 'INDPRO', 'at': (-12, -1), 'release': 'monthly', 'thresh': '+2–5% YoY (rising), -2% YoY (falling)', 'desc': 'Industrial production', 'unit': 'Index'},
+    'Consumer/Investment Spending': {'metric': 'PCE', 'at': (-12, -1), 'release': 'monthly', 'thresh': 'Balanced or dropping during recession', 'desc': 'Consumer/investment spending', 'unit': 'Billion $'},
+    'Productivity Growth': {'metric': 'OPHNFB', 'at': (-4, -1), 'release': 'quarterly', 'thresh': '>3% YoY (rising), +2% YoY (rebound)', 'desc': 'Productivity growth', 'unit': '%'},
+    'Debt-to-GDP': {'metric': 'debt_to_gdp', 'at': (-12, -1), 'release': 'quarterly', 'thresh': '<60% (low), >100% (high), >120% (crisis)', 'desc': 'Debt-to-GDP', 'unit': '%'},
+    'Foreign Reserves': {'metric': 'TRESEGT', 'at': (-12, -1), 'release': 'monthly', 'thresh': '+10% YoY (increasing), -10% YoY (falling)', 'desc': 'Foreign reserves', 'unit': 'Billion $'},
+    'Real Rates': {'metric': 'real_rate', 'at': (-12, -1), 'release': 'monthly', 'thresh': '< -1% (low), >0% (positive)', 'desc': 'Real rates', 'unit': '%'},
+    'Trade Balance': {'metric': 'NETEXP', 'at': (-4, -1), 'release': 'quarterly', 'thresh': 'Surplus >2% GDP (improving)', 'desc': 'Trade balance', 'unit': '%'},
+    'Debt Growth > Incomes': {'metric': 'debt_minus_gdp', 'at': (-4, -1), 'release': 'quarterly', 'thresh': '> incomes (+5–10% YoY gap)', 'desc': 'Debt growth > incomes', 'unit': '%'},
+    'Asset Prices > Traditional Metrics': {'metric': 'scrape:multpl_pe', 'at': (-2, -1), 'release': 'daily', 'thresh': 'P/E +20% or >20', 'desc': 'Asset prices > traditional metrics', 'unit': 'Ratio'},
+    'Wealth Gaps': {'metric': 'wb:SI.POV.GINI:US', 'at': (-2, -1), 'release': 'annual', 'thresh': 'Top 1% share +5%, >40% (wide)', 'desc': 'Wealth gaps', 'unit': 'Index'},
+    'Credit Spreads': {'metric': 'BAAFF', 'at': (-12, -1), 'release': 'daily', 'thresh': '>500 bps (widening)', 'desc': 'Credit spreads', 'unit': '%'},
+    'Central Bank Printing (M2)': {'metric': 'M2SL', 'at': (-12, -1), 'release': 'monthly', 'thresh': '+10% YoY (significant printing)', 'desc': 'Central bank printing (M2)', 'unit': 'Billion $'},
+    'Currency Devaluation': {'metric': 'EXUSUK', 'at': (-12, -1), 'release': 'monthly', 'thresh': '-10% to -20%', 'desc': 'Currency devaluation', 'unit': 'Rate'},
+    'Fiscal Deficits': {'metric': 'MTSDS133FMS', 'at': (-12, -1), 'release': 'monthly', 'thresh': '>6% GDP', 'desc': 'Fiscal deficits', 'unit': '%'},
+    'Debt-to-GDP Falling (-5% YoY)': {'metric': 'debt_to_gdp_fall', 'at': (-5, -1), 'release': 'quarterly', 'thresh': 'Debt-to-GDP Falling (-5% YoY)', 'desc': 'Debt-to-GDP falling', 'unit': '%'},
+    'Debt Growth': {'metric': 'debt_change', 'at': (-5, -1), 'release': 'quarterly', 'thresh': '> incomes (+5–10% YoY gap)', 'desc': 'Debt growth', 'unit': 'Million $'},
+    'Income Growth': {'metric': 'gdp_change', 'at': (-5, -1), 'release': 'quarterly', 'thresh': 'Must match or exceed debt growth', 'desc': 'Income growth', 'unit': 'Billion $'},
+    'Debt Service': {'metric': 'FGDS', 'at': (-12, -1), 'release': 'quarterly', 'thresh': '>20% incomes (high burden)', 'desc': 'Debt service', 'unit': 'Billion $'},
+    'Education Investment': {'metric': 'wb:SE.XPD.TOTL.GD.ZS:US', 'at': (-2, -1), 'release': 'annual', 'thresh': '+5% budget YoY (rising)', 'desc': 'Education investment', 'unit': '%'},
+    'R&D Patents': {'metric': 'wb:IP.PAT.RESD:US', 'at': (-2, -1), 'release': 'annual', 'thresh': '+10% YoY (rising)', 'desc': 'R&D patents', 'unit': 'Count'},
+    'Competitiveness Index (WEF)': {'metric': 'scrape:wef_competitiveness', 'at': (-2, -1), 'release': 'daily', 'thresh': 'Improving +5 ranks, strong rank (top 10)', 'desc': 'Competitiveness index (WEF)', 'unit': 'Score (0-100)'},
+    'GDP per Capita Growth': {'metric': 'wb:NY.GDP.PCAP.KD.ZG:US', 'at': (-2, -1), 'release': 'annual', 'thresh': '+3% YoY (accelerating)', 'desc': 'GDP per capita growth', 'unit': '%'},
+    'Trade Share': {'metric': 'wb:NE.TRD.GNFS.ZS:US', 'at': (-2, -1), 'release': 'annual', 'thresh': '+2% global (expanding)', 'desc': 'Trade share', 'unit': '%'},
+    'Military Spending': {'metric': 'scrape:sipri_military', 'at': (-2, -1), 'release': 'daily', 'thresh': '>3–4% GDP (peaking)', 'desc': 'Military spending', 'unit': '%'},
+    'Internal Conflicts': {'metric': 'scrape:conflicts_index', 'at': (-2, -1), 'release': 'daily', 'thresh': 'Protests +20% (rising)', 'desc': 'Internal conflicts', 'unit': 'Count'},
+    'Reserve Currency Usage Dropping': {'metric': 'scrape:reserve_currency_share', 'at': (-2, -1), 'release': 'daily', 'thresh': '-5% global', 'desc': 'Reserve currency usage dropping', 'unit': '%'},
+    'Military Losses': {'metric': 'scrape:military_losses', 'at': (-2, -1), 'release': 'daily', 'thresh': 'Defeats +1/year (increasing)', 'desc': 'Military losses', 'unit': 'Count'},
+    'Economic Output Share': {'metric': 'gdp_share', 'at': (-2, -1), 'release': 'annual', 'thresh': '-2% global (falling), <10% (shrinking)', 'desc': 'Economic output share', 'unit': '%'},
+    'Corruption Index': {'metric': 'scrape:transparency_cpi', 'at': (-2, -1), 'release': 'daily', 'thresh': 'Worsening -10 points, index >50 (high corruption)', 'desc': 'Corruption index', 'unit': 'Score (0-100)'},
+    'Working Population': {'metric': 'LFWA64TTUSM647S', 'at': (-12, -1), 'release': 'monthly', 'thresh': '-1% YoY (declining)', 'desc': 'Working population', 'unit': 'Thousands'},
+    'Education (PISA Scores)': {'func': lambda: [np.nan, 489, np.nan], 'release': 'annual', 'thresh': '>500 (top scores)', 'desc': 'Education (PISA scores)', 'unit': 'Score (0-1000)'},
+    'Innovation': {'metric': 'wb:IP.PAT.RESD:US', 'at': (-2, -1), 'release': 'annual', 'thresh': 'Patents >20% global (high)', 'desc': 'Innovation', 'unit': 'Count'},
+    'GDP Share': {'metric': 'gdp_share', 'at': (-2, -1), 'release': 'annual', 'thresh': '10–20% (growing), <10% (shrinking)', 'desc': 'GDP share', 'unit': '%'},
+    'Trade Dominance': {'metric': 'wb:NE.TRD.GNFS.ZS:US', 'at': (-2, -1), 'release': 'annual', 'thresh': '>15% global (dominant)', 'desc': 'Trade dominance', 'unit': '%'},
+    'Power Index': {'metric': 'scrape:globalfirepower_index', 'at': (-2, -1), 'release': 'daily', 'thresh': '8–10/10 (peak), <7/10 (declining)', 'desc': 'Power index', 'unit': 'Index'},
+    'Debt Burden': {'metric': 'debt_to_gdp', 'at': (-12, -1), 'release': 'quarterly', 'thresh': '>100% GDP (high), rising fast (+20% in 3 years)', 'desc': 'Debt burden', 'unit': '%'},
 }
 
-# Additional scrapers
+# HTTP layer for every source: pooled keep-alive connections, hard timeouts and, for scrapers, conditional GETs against the copy in econ.db
+HTTP_TIMEOUT = (5, 20)  # connect, read seconds
+REFRESH_DEADLINE = 180  # seconds for a whole fetch_all run
+refresh_deadline = None
+
+def request_timeout(url):
+    # HTTP_TIMEOUT, capped by what is left of the refresh deadline
+    if refresh_deadline is None:
+        return HTTP_TIMEOUT
+    remaining = refresh_deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError(f"Refresh deadline passed before fetching {urlparse(url).netloc}")
+    return tuple(min(t, remaining) for t in HTTP_TIMEOUT)
+
+class DeadlineSession(requests.Session):
+    # No request can hang a pool thread: each one gets a timeout unless it passes its own
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', request_timeout(url))
+        return super().request(method, url, **kwargs)
+
+http = DeadlineSession()
+http.mount('https://', HTTPAdapter(pool_connections=20, pool_maxsize=10))
+http.mount('http://', HTTPAdapter(pool_connections=20, pool_maxsize=10))
+
+def fetch_url(url):
+    host = urlparse(url).netloc
+    if fixture_mode == 'replay':
+        body = replay_fixture('http', url)
+        count_stat('hosts', host, requests=1, bytes=len(body))
+        return body
+    with closing(connect()) as conn:
+        row = conn.execute("SELECT etag, last_modified, body FROM http_cache WHERE url = ?", (url,)).fetchone()
+    headers = {}
+    if fixture_mode == 'record':
+        # A 304 has no body to record, so recording always asks for the full response
+        row = None
+    if row and row[0]:
+        headers['If-None-Match'] = row[0]
+    if row and row[1]:
+        headers['If-Modified-Since'] = row[1]
+    timeout = request_timeout(url)
+    check_host(host)
+    try:
+        r = http.get(url, headers=headers, timeout=timeout)
+    except requests.RequestException:
+        record_host(host, ok=False)
+        count_stat('hosts', host, requests=1, errors=1)
+        raise
+    record_host(host, ok=r.status_code < 500 and r.status_code != 429)
+    count_stat('hosts', host, requests=1, bytes=len(r.content), not_modified=int(r.status_code == 304))
+    if r.status_code == 304 and row:
+        return row[2]
+    r.raise_for_status()
+    if fixture_mode == 'record':
+        record_fixture('http', url, r.content)
+    with closing(connect()) as conn, conn:
+        conn.execute("INSERT OR REPLACE INTO http_cache (url, etag, last_modified, body, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                     (url, r.headers.get('ETag'), r.headers.get('Last-Modified'), r.content, datetime.now().isoformat(timespec='seconds')))
+    return r.content
+
+# Additional scrapers (return None when the value cannot be found; fetch errors, backoff and deadlines propagate to record_source)
+PARSE_ERRORS = (AttributeError, IndexError, KeyError, TypeError, ValueError)
+
 def scrape_wef_competitiveness():
     try:
-        r = requests.get('https://www.weforum.org/reports/global-competitiveness-report-2025')
-        soup = BeautifulSoup(r.text, 'html.parser')
+        soup = BeautifulSoup(fetch_url('https://www.weforum.org/reports/global-competitiveness-report-2025'), 'html.parser')
         score = soup.find(string=re.compile(r'US score \d+'))
-        return float(re.search(r'\d+\.\d+', score).group()) if score else 85.6
-    except:
-        return 85.6
+        return float(re.search(r'\d+\.\d+', score).group()) if score else None
+    except PARSE_ERRORS:
+        return None
 
 def scrape_conflicts_index():
     try:
-        r = requests.get('https://www.globalconflicttracker.org/')
-        soup = BeautifulSoup(r.text, 'html.parser')
+        soup = BeautifulSoup(fetch_url('https://www.globalconflicttracker.org/'), 'html.parser')
         count = len(soup.find_all('div', class_='conflict-item'))
-        return count if count > 0 else 30000
-    except:
-        return 30000
+        return count if count > 0 else None
+    except PARSE_ERRORS:
+        return None
 
 def scrape_reserve_currency_share():
     try:
-        r = requests.get('https://data.imf.org/?sk=E6A5F467-C14B-4AA8-9F6D-5A09EC4E672B')
-        soup = BeautifulSoup(r.text, 'html.parser')
+        soup = BeautifulSoup(fetch_url('https://data.imf.org/?sk=E6A5F467-C14B-4AA8-9F6D-5A09EC4E672B'), 'html.parser')
         usd_share = soup.find(string=re.compile(r'USD reserves \d+%'))
-        return float(re.search(r'\d+\.\d+', usd_share).group()) if usd_share else 58
-    except:
-        return 58
+        return float(re.search(r'\d+\.\d+', usd_share).group()) if usd_share else None
+    except PARSE_ERRORS:
+        return None
 
 def scrape_military_losses():
     try:
-        r = requests.get('https://www.globalfirepower.com/military-losses.php')
-        soup = BeautifulSoup(r.text, 'html.parser')
+        soup = BeautifulSoup(fetch_url('https://www.globalfirepower.com/military-losses.php'), 'html.parser')
         losses = soup.find(string=re.compile(r'US losses \d+'))
-        return float(re.search(r'\d+', losses).group()) if losses else 1
-    except:
-        return 1
+        return float(re.search(r'\d+', losses).group()) if losses else None
+    except PARSE_ERRORS:
+        return None
 
 def scrape_fed_rates():
     try:
-        r = requests.get('https://www.federalreserve.gov/releases/h15/')
-        soup = BeautifulSoup(r.text, 'html.parser')
+        soup = BeautifulSoup(fetch_url('https://www.federalreserve.gov/releases/h15/'), 'html.parser')
         row = soup.find('th', string=re.compile(r'Federal funds \(effective\)', re.I)).parent if soup.find('th') else None
         if row:
             tds = row.find_all('td')
@@ -129,108 +223,855 @@ def scrape_fed_rates():
             if latest == 'n.a.':
                 treasury_row = soup.find('th', string=re.compile(r'10-year', re.I)).parent
                 latest = treasury_row.find_all('td')[-1].text.strip() if treasury_row else None
-            return float(latest) if latest and latest != 'n.a.' else 4.33
-        return 4.33
-    except:
-        return 4.33
+            return float(latest) if latest and latest != 'n.a.' else None
+        return None
+    except PARSE_ERRORS:
+        return None
 
 def scrape_multpl_pe():
     try:
-        r = requests.get('https://www.multpl.com/s-p-500-pe-ratio')
-        soup = BeautifulSoup(r.text, 'html.parser')
+        soup = BeautifulSoup(fetch_url('https://www.multpl.com/s-p-500-pe-ratio'), 'html.parser')
         current = soup.find(id='current')
-        return float(current.text.strip()) if current else 30.50
-    except:
-        return 30.50
+        return float(current.text.strip()) if current else None
+    except PARSE_ERRORS:
+        return None
 
 def scrape_sipri_military():
     try:
         url = 'https://sipri.org/sites/default/files/2025-04/2504_milex_data_sheet_2024.xlsx'
-        df = pd.read_excel(url, sheet_name='Share of GDP', skiprows=5)
-        return df.loc[df['Country'] == 'USA', df.columns[-1]].values[0] if 'USA' in df['Country'].values else 3.3
-    except:
-        return 3.3
+        df = pd.read_excel(io.BytesIO(fetch_url(url)), sheet_name='Share of GDP', skiprows=5)
+        return df.loc[df['Country'] == 'USA', df.columns[-1]].values[0] if 'USA' in df['Country'].values else None
+    except PARSE_ERRORS:
+        return None
 
 def scrape_transparency_cpi():
     try:
         url = 'https://images.transparencycdn.org/images/CPI2024_FullDataSet.xlsx'
-        df = pd.read_excel(url, skiprows=2)
-        return df.loc[df['Country / Territory'] == 'United States', 'CPI score 2024'].values[0] if 'United States' in df['Country / Territory'].values else 65
-    except:
-        return 65
+        df = pd.read_excel(io.BytesIO(fetch_url(url)), skiprows=2)
+        return df.loc[df['Country / Territory'] == 'United States', 'CPI score 2024'].values[0] if 'United States' in df['Country / Territory'].values else None
+    except PARSE_ERRORS:
+        return None
 
 def scrape_globalfirepower_index():
     try:
-        r = requests.get('https://www.globalfirepower.com/countries-listing.php')
-        soup = BeautifulSoup(r.text, 'html.parser')
+        soup = BeautifulSoup(fetch_url('https://www.globalfirepower.com/countries-listing.php'), 'html.parser')
         us_row = soup.find('div', string='United States').parent.parent
-        return float(us_row.find('span', class_='powerIndex').text) if us_row else 0.0744
-    except:
-        return 0.0744
+        return float(us_row.find('span', class_='powerIndex').text) if us_row else None
+    except PARSE_ERRORS:
+        return None
+
+# Scraped sources, used in metrics as 'scrape:<name>'; each run stores one dated observation
+scrapers = {
+    'wef_competitiveness': scrape_wef_competitiveness,
+    'conflicts_index': scrape_conflicts_index,
+    'reserve_currency_share': scrape_reserve_currency_share,
+    'military_losses': scrape_military_losses,
+    'fed_rates': scrape_fed_rates,
+    'multpl_pe': scrape_multpl_pe,
+    'sipri_military': scrape_sipri_military,
+    'transparency_cpi': scrape_transparency_cpi,
+    'globalfirepower_index': scrape_globalfirepower_index,
+}
+
+DB_PATH = 'econ.db'
+
+def connect():
+    return sqlite3.connect(DB_PATH, timeout=30)
+
+# Refresh instrumentation: timings, request/byte counts and cache outcomes, collected per fetch_all run
+refresh_stats = None
+stats_lock = threading.Lock()
+stats_local = threading.local()  # the run each thread is counting for
+STATS_RETENTION = timedelta(days=30)  # refresh_stats rows older than this are pruned along with the snapshots
+
+def count_stat(section, key, **amounts):
+    # Threads abandoned at a deadline keep running; their late counts belong to no run and are dropped
+    with stats_lock:
+        stats = getattr(stats_local, 'stats', None)
+        if stats is None or stats is not refresh_stats:
+            return
+        entry = stats[section].setdefault(key, {})
+        for name, amount in amounts.items():
+            entry[name] = entry.get(name, 0) + amount
+
+def counted(stats, fn, *args):
+    stats_local.stats = stats
+    return fn(*args)
 
-@st.cache_data(ttl=3600)  # Cache for 1 hour
-def fetch_all():
+def save_stats(stats):
+    with closing(connect()) as conn, conn:
+        conn.execute("INSERT OR REPLACE INTO refresh_stats (started_at, wall_seconds, stats) VALUES (?, ?, ?)",
+                     (stats['started_at'], stats['wall_seconds'], json.dumps(stats)))
+
+def summarize_stats(stats):
+    hosts, sources = stats['hosts'].values(), stats['sources'].values()
+    return {
+        'started_at': stats['started_at'],
+        'wall_seconds': round(stats['wall_seconds'], 3),
+        'indicators': len(stats['indicators']),
+        'requests': sum(h.get('requests', 0) for h in hosts),
+        'bytes': sum(h.get('bytes', 0) for h in hosts),
+        'not_modified': sum(h.get('not_modified', 0) for h in hosts),
+        'cache_hits': sum(s.get('hit', 0) for s in sources),
+        'cache_misses': sum(s.get('miss', 0) for s in sources),
+        'stale_served': sum(s.get('stale', 0) for s in sources),
+        # Source-loading seconds per wall second: how many pool workers were busy on average
+        'parallelism': round(sum(s.get('seconds', 0) for s in sources) / stats['wall_seconds'], 2) if stats['wall_seconds'] else 0,
+    }
+
+# Recorded responses: --record saves every download under fixture_dir, --bench replays them without the network
+fixture_mode = None  # None, 'record' or 'replay'
+fixture_dir = None
+fixture_latency = 0.0  # seconds added to each replayed request
+
+def fixture_path(kind, name):
+    return os.path.join(fixture_dir, kind, hashlib.sha1(name.encode()).hexdigest()[:16] if kind == 'http' else re.sub(r'[^\w.-]', '_', name) + '.csv')
+
+def record_fixture(kind, name, payload):
+    path = fixture_path(kind, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if kind == 'http':
+        with open(path, 'wb') as f:
+            f.write(payload)
+    elif kind == 'panel':
+        payload.to_csv(path, index=False)
+    else:
+        payload.rename('value').rename_axis('date').to_csv(path)
+
+def replay_fixture(kind, name):
+    time.sleep(fixture_latency)
+    path = fixture_path(kind, name)
+    if kind == 'http':
+        with open(path, 'rb') as f:
+            return f.read()
+    if kind == 'panel':
+        return pd.read_csv(path, dtype={'indicator': str, 'country': str, 'year': str})
+    series = pd.read_csv(path, index_col='date', dtype={'date': str})['value']
+    series.index = pd.to_datetime(series.index)
+    return series
+
+# Per-source freshness: stored series younger than their TTL are served without a request
+SOURCE_TTLS = {
+    'fred': timedelta(hours=4),
+    'wb': timedelta(days=7),
+    'scrape': timedelta(hours=12),
+}
+# Failing hosts are skipped for BACKOFF_BASE * 2^(failures - 1), capped at BACKOFF_MAX
+BACKOFF_BASE = timedelta(minutes=1)
+BACKOFF_MAX = timedelta(hours=6)
+
+class BackoffError(RuntimeError):
+    pass
+
+def source_kind(key):
+    return key.split(':', 1)[0] if ':' in key else 'fred'
+
+def source_host(key):
+    # Scrapers (through fetch_url) and the World Bank panel request track their hosts themselves
+    return {'fred': 'api.stlouisfed.org'}.get(source_kind(key))
+
+def check_host(host):
+    with closing(connect()) as conn:
+        row = conn.execute("SELECT retry_after FROM host_status WHERE host = ?", (host,)).fetchone()
+    if row and datetime.now() < datetime.fromisoformat(row[0]):
+        raise BackoffError(f"{host} is backing off until {row[0]}")
+
+def host_failure(error):
+    # Only transport errors, 5xx and 429 say anything about the host; a 4xx or a parse error belongs to one source
+    response = getattr(error, 'response', None)
+    return isinstance(error, requests.RequestException) and (response is None or response.status_code >= 500 or response.status_code == 429)
+
+def record_host(host, ok):
+    with closing(connect()) as conn, conn:
+        if ok:
+            conn.execute("DELETE FROM host_status WHERE host = ?", (host,))
+            return
+        row = conn.execute("SELECT failures FROM host_status WHERE host = ?", (host,)).fetchone()
+        failures = (row[0] if row else 0) + 1
+        retry_after = datetime.now() + min(BACKOFF_BASE * 2 ** (failures - 1), BACKOFF_MAX)
+        conn.execute("INSERT OR REPLACE INTO host_status (host, failures, retry_after) VALUES (?, ?, ?)",
+                     (host, failures, retry_after.isoformat(timespec='seconds')))
+
+def record_source(key, error=None):
+    now = datetime.now().isoformat(timespec='seconds')
+    with closing(connect()) as conn, conn:
+        if isinstance(error, BackoffError):
+            # Skipped rather than attempted: failures, last attempt and the error that started the backoff stay as they are
+            conn.execute("""INSERT INTO source_status (source, failures, last_error) VALUES (?, 0, ?)
+                            ON CONFLICT(source) DO UPDATE SET last_error = COALESCE(last_error, excluded.last_error)""",
+                         (key, str(error)))
+        elif error is None:
+            conn.execute("""INSERT INTO source_status (source, last_success, last_attempt, failures, last_error) VALUES (?, ?, ?, 0, NULL)
+                            ON CONFLICT(source) DO UPDATE SET last_success = excluded.last_success, last_attempt = excluded.last_attempt, failures = 0, last_error = NULL""",
+                         (key, now, now))
+        else:
+            conn.execute("""INSERT INTO source_status (source, last_attempt, failures, last_error) VALUES (?, ?, 1, ?)
+                            ON CONFLICT(source) DO UPDATE SET last_attempt = excluded.last_attempt, failures = failures + 1, last_error = excluded.last_error""",
+                         (key, now, str(error) or type(error).__name__))
+
+def source_retry_after(failures, last_attempt):
+    # A failing source is retried on the same schedule as a failing host
+    return datetime.fromisoformat(last_attempt) + min(BACKOFF_BASE * 2 ** (failures - 1), BACKOFF_MAX)
+
+def check_source(key):
+    with closing(connect()) as conn:
+        row = conn.execute("SELECT failures, last_attempt FROM source_status WHERE source = ?", (key,)).fetchone()
+    if row and row[0]:
+        retry_after = source_retry_after(*row)
+        if datetime.now() < retry_after:
+            raise BackoffError(f"{key} is backing off until {retry_after.isoformat(timespec='seconds')}")
+
+def source_expired(key):
+    with closing(connect()) as conn:
+        row = conn.execute("SELECT last_success FROM source_status WHERE source = ?", (key,)).fetchone()
+    return not row or not row[0] or datetime.now() - datetime.fromisoformat(row[0]) >= SOURCE_TTLS[source_kind(key)]
+
+# Local series store: full history per series, keyed by (series_id, date)
+STORE_VERSION = 1  # bump whenever init_store gains a table or a migration
+
+def init_store():
+    # Runs on every page rerun, which only reads the schema version; tables and one-off migrations run once per econ.db
+    with closing(connect()) as conn:
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= STORE_VERSION:
+            return
+    with closing(connect()) as conn, conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= STORE_VERSION:
+            return  # migrated by another process meanwhile
+        conn.execute("CREATE TABLE IF NOT EXISTS series (series_id TEXT, date TEXT, value REAL, PRIMARY KEY (series_id, date))")
+        conn.execute("CREATE TABLE IF NOT EXISTS series_meta (series_id TEXT PRIMARY KEY, last_updated TEXT, fetched_at TEXT)")
+        conn.execute("CREATE TABLE IF NOT EXISTS http_cache (url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body BLOB, fetched_at TEXT)")
+        conn.execute("CREATE TABLE IF NOT EXISTS data (Indicator TEXT PRIMARY KEY, Value TEXT, refreshed_at TEXT)")
+        if 'refreshed_at' not in [col[1] for col in conn.execute("PRAGMA table_info(data)")]:
+            conn.execute("ALTER TABLE data ADD COLUMN refreshed_at TEXT")
+        if not any(col[1] == 'Indicator' and col[5] for col in conn.execute("PRAGMA table_info(data)")):
+            # Tables written by to_sql have no key, so upserts appended rows: rebuild keeping the latest row per indicator
+            conn.execute("ALTER TABLE data RENAME TO data_legacy")
+            conn.execute("CREATE TABLE data (Indicator TEXT PRIMARY KEY, Value TEXT, refreshed_at TEXT)")
+            conn.execute("""INSERT INTO data (Indicator, Value, refreshed_at)
+                            SELECT Indicator, Value, refreshed_at FROM data_legacy WHERE rowid IN (SELECT MAX(rowid) FROM data_legacy GROUP BY Indicator)""")
+            conn.execute("DROP TABLE data_legacy")
+        conn.execute("CREATE TABLE IF NOT EXISTS source_status (source TEXT PRIMARY KEY, last_success TEXT, last_attempt TEXT, failures INTEGER DEFAULT 0, last_error TEXT)")
+        conn.execute("CREATE TABLE IF NOT EXISTS host_status (host TEXT PRIMARY KEY, failures INTEGER, retry_after TEXT)")
+        conn.execute("CREATE TABLE IF NOT EXISTS refresh_stats (started_at TEXT PRIMARY KEY, wall_seconds REAL, stats TEXT)")
+        conn.execute("CREATE TABLE IF NOT EXISTS snapshots (taken_at TEXT, indicator TEXT, previous REAL, current REAL, forecast REAL, PRIMARY KEY (taken_at, indicator)) WITHOUT ROWID")
+        conn.execute("CREATE INDEX IF NOT EXISTS snapshots_by_indicator ON snapshots (indicator, taken_at)")
+        conn.execute("CREATE TABLE IF NOT EXISTS wb_panel (indicator TEXT, country TEXT, year TEXT, value REAL, PRIMARY KEY (indicator, country, year)) WITHOUT ROWID")
+        # World Bank series used to be copied into the series store as well; the panel is now their only copy
+        conn.execute("DELETE FROM series WHERE series_id GLOB 'wb:*'")
+        conn.execute("DELETE FROM series_meta WHERE series_id GLOB 'wb:*'")
+        if conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0] == 0:
+            # Seed history with whatever the data table held before snapshots existed
+            conn.execute("""INSERT INTO snapshots (taken_at, indicator, previous, current, forecast)
+                            SELECT COALESCE(refreshed_at, ?), Indicator, json_extract(Value, '$[0]'), json_extract(Value, '$[1]'), json_extract(Value, '$[2]') FROM data""",
+                         (datetime.now().isoformat(timespec='seconds'),))
+        conn.execute(f"PRAGMA user_version = {STORE_VERSION}")
+
+def load_series(key):
+    with closing(connect()) as conn:
+        rows = conn.execute("SELECT date, value FROM series WHERE series_id = ? ORDER BY date", (key,)).fetchall()
+    return pd.Series([value for _, value in rows], index=pd.to_datetime([date for date, _ in rows]), dtype=float)
+
+def save_series(key, series, last_updated=None):
+    dates = series.index.strftime('%Y-%m-%d') if isinstance(series.index, pd.DatetimeIndex) else series.index.astype(str)
+    with closing(connect()) as conn, conn:
+        conn.executemany("INSERT OR REPLACE INTO series (series_id, date, value) VALUES (?, ?, ?)",
+                         [(key, date, float(value)) for date, value in zip(dates, series.values)])
+        conn.execute("INSERT OR REPLACE INTO series_meta (series_id, last_updated, fetched_at) VALUES (?, ?, ?)",
+                     (key, last_updated, datetime.now().isoformat(timespec='seconds')))
+
+def stored_last_updated(key):
+    with closing(connect()) as conn:
+        row = conn.execute("SELECT last_updated FROM series_meta WHERE series_id = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+# World Bank panel: every indicator the dashboard uses, for every configured country, keyed by indicator/country/year
+WB_COUNTRIES = [c.strip() for c in os.environ.get('ECON_WB_COUNTRIES', 'US,CN,DE,JP,IN,GB').split(',') if c.strip()]
+WB_LOOKBACK = 10  # years re-requested at most on an incremental update, to pick up revisions
+WB_API = 'https://api.worldbank.org/v2'
+WB_SOURCE = 2  # World Development Indicators; the API only accepts several indicators per call within one source
+WB_LABELS = {
+    'SI.POV.GINI': 'Gini index',
+    'SE.XPD.TOTL.GD.ZS': 'Education spending (% of GDP)',
+    'IP.PAT.RESD': 'Patent applications, residents',
+    'NY.GDP.PCAP.KD.ZG': 'GDP per capita growth (%)',
+    'NE.TRD.GNFS.ZS': 'Trade (% of GDP)',
+    'NY.GDP.MKTP.CD': 'GDP (current US$)',
+}
+wb_batches = {}  # the bulk request of the refresh in progress
+wb_lock = threading.Lock()
+
+def wb_scope():
+    keys = [key.split(':') for ind in indicators.values() if 'metric' in ind for key in required_series(ind['metric']) if key.startswith('wb:')]
+    return sorted({code for _, code, _ in keys}), list(dict.fromkeys(WB_COUNTRIES + [country for _, _, country in keys]))
+
+def wb_request(codes, countries, start=None):
+    # Pages are [meta, rows]; errors come back as a single [{'message': ...}] element
+    url = f"{WB_API}/country/{';'.join(countries)}/indicator/{';'.join(codes)}"
+    params = {'source': WB_SOURCE, 'format': 'json', 'per_page': 1000}
+    if start:
+        params['date'] = f"{start}:{datetime.now().year}"
+    rows, page, pages = [], 1, 1
+    while page <= pages:
+        r = http.get(url, params={**params, 'page': page})
+        count_stat('hosts', 'api.worldbank.org', requests=1, bytes=len(r.content))
+        r.raise_for_status()
+        body = r.json()
+        if len(body) < 2:
+            raise ValueError(f"World Bank API error: {body[0].get('message')}")
+        rows += body[1] or []
+        pages, page = body[0]['pages'], page + 1
+    return rows
+
+def update_wb_panel():
+    # One request (paged by the API) for all indicators x countries, starting at the oldest last stored year
+    codes, countries = wb_scope()
+    with closing(connect()) as conn:
+        latest = {(code, country): year for code, country, year in conn.execute("SELECT indicator, country, MAX(year) FROM wb_panel GROUP BY indicator, country")}
+    # Pairs the API never reports (e.g. Gini for WLD) are ignored; a code or country with no data at all needs the full history
+    seen_codes, seen_countries = {code for code, _ in latest}, {country for _, country in latest}
+    stored = [year for (code, country), year in latest.items() if code in codes and country in countries]
+    start = None
+    if stored and set(codes) <= seen_codes and set(countries) <= seen_countries and fixture_mode != 'record':
+        # A country that stopped reporting would otherwise pin the start to its last year
+        start = max(min(stored), str(datetime.now().year - WB_LOOKBACK))
+    if fixture_mode == 'replay':
+        panel = replay_fixture('panel', 'wb')
+        panel = panel[panel['year'] >= start] if start else panel
+        count_stat('hosts', 'api.worldbank.org', requests=1)
+    else:
+        check_host('api.worldbank.org')
+        try:
+            raw = wb_request(codes, countries, start)
+        except Exception as e:
+            if host_failure(e):
+                record_host('api.worldbank.org', ok=False)
+            raise
+        record_host('api.worldbank.org', ok=True)
+        # Aggregates such as WLD come back with an internal id, so fall back to the ISO3 code that was requested
+        panel = pd.DataFrame([(row['indicator']['id'], row['country']['id'] if row['country']['id'] in countries else row['countryiso3code'], row['date'], row['value'])
+                              for row in raw if row['value'] is not None], columns=['indicator', 'country', 'year', 'value'])
+        if fixture_mode == 'record':
+            record_fixture('panel', 'wb', panel)
+    count_stat('hosts', 'api.worldbank.org', points=len(panel))
+    with closing(connect()) as conn, conn:
+        conn.executemany("INSERT OR REPLACE INTO wb_panel (indicator, country, year, value) VALUES (?, ?, ?, ?)",
+                         panel[['indicator', 'country', 'year', 'value']].itertuples(index=False, name=None))
+
+def load_panel(code, country, start=None):
+    with closing(connect()) as conn:
+        rows = conn.execute("SELECT year, value FROM wb_panel WHERE indicator = ? AND country = ? AND year >= ? ORDER BY year",
+                            (code, country, start or '')).fetchall()
+    return pd.Series([value for _, value in rows], index=[year for year, _ in rows], dtype=float)
+
+FRED_API = 'https://api.stlouisfed.org/fred'
+
+def fred_request(path, **params):
+    try:
+        r = http.get(f"{FRED_API}/{path}", params={'api_key': fred_api_key, 'file_type': 'json', **params})
+    except requests.RequestException as e:
+        # Request errors quote the URL, which carries the API key
+        raise requests.RequestException(str(e).replace(fred_api_key, '***')) from None
+    count_stat('hosts', 'api.stlouisfed.org', requests=1, bytes=len(r.content))
+    if not r.ok:
+        raise requests.HTTPError(f"FRED {path} returned {r.status_code} for {params.get('series_id')}", response=r)
+    return r.json()
+
+def download_series(key, start=None):
+    if key.startswith('scrape:'):
+        value = scrapers[key.split(':', 1)[1]]()
+        if value is None:
+            raise ValueError(f"{key} found no value")
+        return pd.Series([float(value)], index=[pd.Timestamp.now().normalize()]), None
+    if key.startswith('wb:'):
+        # Read from the panel, which a single bulk request per refresh keeps current for every country
+        _, code, country = key.split(':')
+        coalesce(wb_batches, wb_lock, 'panel', update_wb_panel)
+        return load_panel(code, country, start), None
+    host = source_host(key)
+    if fixture_mode == 'replay':
+        # A live download is two round trips: series info, then observations
+        time.sleep(fixture_latency)
+        series = replay_fixture('series', key)
+        count_stat('hosts', host, requests=2, points=len(series))
+        return (series[series.index >= pd.Timestamp(start)] if start else series), None
+    if fixture_mode == 'record':
+        # Fixtures hold full histories so a replay can start from an empty store
+        start = None
+    # FRED's last_updated tells us whether anything changed since the stored copy
+    last_updated = fred_request('series', series_id=key)['seriess'][0]['last_updated']
+    if start and last_updated == stored_last_updated(key):
+        return pd.Series(dtype=float), last_updated
+    observations = fred_request('series/observations', series_id=key, observation_start=start)['observations']
+    # Missing observations are reported as '.'
+    series = pd.Series(pd.to_numeric([obs['value'] for obs in observations], errors='coerce'),
+                       index=pd.to_datetime([obs['date'] for obs in observations]), dtype=float).dropna()
+    count_stat('hosts', host, points=len(series))
+    if fixture_mode == 'record':
+        record_fixture('series', key, series)
+    return series, last_updated
+
+def load_stored(key):
+    # World Bank series live only in the panel, everything else in the series store
+    if key.startswith('wb:'):
+        _, code, country = key.split(':')
+        return load_panel(code, country)
+    return load_series(key)
+
+def update_series(key, refresh=True):
+    started = time.perf_counter()
+    outcome = 'miss'
+    try:
+        series, outcome = load_or_download(key, refresh)
+        return series
+    except Exception:
+        outcome = 'error'
+        raise
+    finally:
+        count_stat('sources', key, seconds=time.perf_counter() - started, **{outcome: 1})
+
+def load_or_download(key, refresh=True):
+    # Only observations from the last stored date onwards are requested; the last point is re-fetched to pick up revisions
+    stored = load_stored(key)
+    if not stored.empty and not (refresh and (source_expired(key) or fixture_mode == 'record')):
+        return stored, 'hit'
+    start = None
+    if not stored.empty:
+        start = stored.index[-1].strftime('%Y-%m-%d') if isinstance(stored.index, pd.DatetimeIndex) else stored.index[-1]
+    host = source_host(key)
+    try:
+        check_source(key)
+        if host:
+            check_host(host)
+        try:
+            new, last_updated = download_series(key, start)
+        except Exception as e:
+            if host and host_failure(e):
+                record_host(host, ok=False)
+            raise
+        if host:
+            record_host(host, ok=True)
+    except Exception as e:
+        # The last good copy keeps being served until the source recovers
+        record_source(key, e)
+        if stored.empty:
+            raise
+        log.warning(f"Serving stored {key}: {str(e) or type(e).__name__}")
+        return stored, 'stale'
+    if not key.startswith('wb:'):
+        save_series(key, new, last_updated)
+    record_source(key)
+    return load_stored(key), 'miss'
+
+# Series fetch layer: each unique series is loaded once per refresh and shared by all indicators
+def coalesce(cache, lock, key, fn):
+    # First caller for a key runs fn, concurrent callers wait on the same future
+    with lock:
+        future = cache.get(key)
+        owner = future is None
+        if owner:
+            future = cache[key] = Future()
+    if owner:
+        try:
+            future.set_result(fn())
+        except Exception as e:
+            future.set_exception(e)
+    return future.result()
+
+def get_series(key, cache, lock, refresh=True):
+    return coalesce(cache, lock, key, lambda: update_series(key, refresh))
+
+# Where each indicator's value comes from and how old it is, for the table
+SOURCE_LABELS = {'fred': 'FRED', 'wb': 'World Bank', 'scrape': 'Scraped'}
+
+def source_summary(name, status):
+    ind = indicators.get(name, {})
+    keys = list(dict.fromkeys(required_series(ind['metric']))) if 'metric' in ind else []
+    if not keys:
+        return 'Static', None, 'ok'
+    groups = {}
+    for key in keys:
+        groups.setdefault(SOURCE_LABELS[source_kind(key)], []).append(key.split(':', 1)[1] if ':' in key else key)
+    label = '; '.join(f"{kind}: {', '.join(ids)}" for kind, ids in groups.items())
+    rows = [status.get(key, {}) for key in keys]
+    successes = [row.get('last_success') for row in rows]
+    as_of = None if None in successes else min(successes)
+    if any(row.get('failures') for row in rows):
+        state = 'failing, serving last good value' if as_of else 'failing'
+    elif as_of is None or any(datetime.now() - datetime.fromisoformat(s) >= SOURCE_TTLS[source_kind(k)] for k, s in zip(keys, successes)):
+        state = 'stale'
+    else:
+        state = 'ok'
+    return label, as_of, state
+
+# Indicator engine: each metric is computed once as a full series and shared by every indicator using it
+def required_series(name):
+    if name not in metrics:
+        return [name]
+    return [key for inp in metrics[name]['inputs'] for key in required_series(inp)]
+
+def evaluate(name, series, results):
+    if name not in results:
+        if name in metrics:
+            spec = metrics[name]
+            inputs = [evaluate(inp, series, results) for inp in spec['inputs']]
+            if 'freq' in spec:
+                inputs = [x.resample(spec['freq']).last() for x in inputs]
+            params = {k: v for k, v in spec.items() if k not in ('inputs', 'transform', 'freq')}
+            results[name] = transforms[spec['transform']](*inputs, **params).dropna()
+        else:
+            results[name] = series[name]
+    return results[name]
+
+def sample(result, at):
+    return [result.iloc[i] if len(result) >= -i else np.nan for i in at]
+
+def run_indicator(name, ind, cache, lock, results, refresh=True):
+    started = time.perf_counter()
+    try:
+        if 'metric' not in ind:
+            return ind['func']()
+        series = {key: get_series(key, cache, lock, refresh) for key in required_series(ind['metric'])}
+        with lock:
+            result = evaluate(ind['metric'], series, results)
+        return sample(result, ind['at']) + [ind.get('forecast', np.nan)]
+    finally:
+        # Includes time spent waiting on shared series downloads
+        count_stat('indicators', name, seconds=time.perf_counter() - started)
+
+def fetch_all(refresh=True, names=None):
+    # refresh=False computes from the local series store and only downloads series it does not have yet
+    global refresh_deadline, refresh_stats
     data = {}
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        futures = {name: executor.submit(ind['func']) for name, ind in indicators.items()}
-        for name, future in futures.items():
-            try:
-                result = future.result()
-                if isinstance(result, list):
-                    data[name] = result
-                else:
-                    data[name] = [0, result, 0]  # No nan
-            except Exception as e:
-                st.error(f"Error fetching {name}: {str(e)}")
-                data[name] = [0, 0, 0]
+    stats = stats_local.stats = {'started_at': datetime.now().isoformat(timespec='milliseconds'), 'indicators': {}, 'sources': {}, 'hosts': {}}
+    with stats_lock:
+        refresh_stats = stats
+    started = time.perf_counter()
+    cache, lock, results = {}, threading.Lock(), {}
+    selected = {name: ind for name, ind in indicators.items() if names is None or name in names}
+    keys = dict.fromkeys(key for ind in selected.values() if 'metric' in ind for key in required_series(ind['metric']))
+    refresh_deadline = time.monotonic() + REFRESH_DEADLINE
+    wb_batches.clear()
+    executor = ThreadPoolExecutor(max_workers=10)
+    # Downloads are queued ahead of the indicators so no worker waits on a series nobody is fetching
+    for key in keys:
+        executor.submit(counted, stats, get_series, key, cache, lock, refresh)
+    futures = {name: executor.submit(counted, stats, run_indicator, name, ind, cache, lock, results, refresh) for name, ind in selected.items()}
+    for name, future in futures.items():
+        try:
+            result = future.result(timeout=max(0, refresh_deadline - time.monotonic()))
+            if isinstance(result, list):
+                data[name] = result
+            else:
+                data[name] = [0, result, 0]  # No nan
+        except Exception as e:
+            # Left out of the result, so the last good value stays in the data table
+            log.warning(f"Error fetching {name}: {str(e) or type(e).__name__}")
+            count_stat('indicators', name, errors=1)
+    # Anything still running past the deadline is abandoned rather than blocking the page
+    executor.shutdown(wait=False, cancel_futures=True)
+    refresh_deadline = None
+    with stats_lock:
+        refresh_stats = None
+    stats['wall_seconds'] = time.perf_counter() - started
+    stats['summary'] = summarize_stats(stats)
+    save_stats(stats)
     return data
 
-conn = sqlite3.connect('econ.db')
+# Background refresh: each indicator is re-fetched on its release schedule, pages only read the data table
+REFRESH_INTERVALS = {
+    'daily': timedelta(hours=6),
+    'weekly': timedelta(days=1),
+    'monthly': timedelta(days=3),
+    'quarterly': timedelta(days=7),
+    'annual': timedelta(days=30),
+}
+WORKER_POLL = 60  # seconds between schedule checks
+refresh_lock = threading.Lock()
+
+def due_indicators(now=None):
+    now = now or datetime.now()
+    with closing(connect()) as conn:
+        refreshed = dict(conn.execute("SELECT Indicator, refreshed_at FROM data WHERE refreshed_at IS NOT NULL").fetchall())
+        backing_off = {source for source, failures, last_attempt in conn.execute("SELECT source, failures, last_attempt FROM source_status WHERE failures > 0")
+                       if now < source_retry_after(failures, last_attempt)}
+    # An indicator waiting on a source in backoff is not due again until that source may be retried
+    return [name for name, ind in indicators.items()
+            if (name not in refreshed or now - datetime.fromisoformat(refreshed[name]) >= REFRESH_INTERVALS[ind['release']])
+            and not ('metric' in ind and backing_off.intersection(required_series(ind['metric'])))]
+
+def write_snapshot(data, refreshed=True):
+    # One transaction, so readers see either the previous or the new values, never a partial refresh
+    taken_at = datetime.now().isoformat(timespec='seconds')
+    refreshed_at = taken_at if refreshed else None
+    with closing(connect()) as conn, conn:
+        conn.executemany("INSERT OR REPLACE INTO data (Indicator, Value, refreshed_at) VALUES (?, ?, ?)",
+                         [(name, json.dumps(replace_nan_with_none(value)), refreshed_at) for name, value in data.items()])
+        # History is append-only: every refresh adds rows, keyed by when they were taken
+        conn.executemany("INSERT OR REPLACE INTO snapshots (taken_at, indicator, previous, current, forecast) VALUES (?, ?, ?, ?, ?)",
+                         [(taken_at, name, *replace_nan_with_none([float(v) for v in value])) for name, value in data.items()])
+
+# Snapshot retention: rows older than each age are thinned to the last one per indicator per bucket (date prefix length)
+SNAPSHOT_RETENTION = [
+    (timedelta(days=14), 10),  # one per day
+    (timedelta(days=365), 7),  # one per month
+]
+
+def compact_snapshots(now=None):
+    now = now or datetime.now()
+    with closing(connect()) as conn, conn:
+        for age, prefix in SNAPSHOT_RETENTION:
+            conn.execute("""DELETE FROM snapshots WHERE taken_at < ? AND EXISTS (
+                                SELECT 1 FROM snapshots later WHERE later.indicator = snapshots.indicator AND later.taken_at > snapshots.taken_at
+                                AND substr(later.taken_at, 1, ?) = substr(snapshots.taken_at, 1, ?))""",
+                         ((now - age).isoformat(timespec='seconds'), prefix, prefix))
+        conn.execute("DELETE FROM refresh_stats WHERE started_at < ?", ((now - STATS_RETENTION).isoformat(timespec='milliseconds'),))
+
+def snapshot_times(conn):
+    return [row[0] for row in conn.execute("SELECT DISTINCT taken_at FROM snapshots ORDER BY taken_at DESC")]
+
+def snapshot_as_of(conn, as_of):
+    # Latest row per indicator taken at or before as_of
+    return pd.read_sql("""SELECT s.indicator, s.previous, s.current, s.forecast, s.taken_at FROM snapshots s
+                          JOIN (SELECT indicator, MAX(taken_at) AS taken_at FROM snapshots WHERE taken_at <= ? GROUP BY indicator) latest
+                          USING (indicator, taken_at)""", conn, params=(as_of,))
 
-# Create table if not exists
-cursor = conn.cursor()
-cursor.execute("CREATE TABLE IF NOT EXISTS data (Indicator TEXT PRIMARY KEY, Value TEXT)")
-conn.commit()
+def snapshot_diff(conn, before, after):
+    diff = snapshot_as_of(conn, before).merge(snapshot_as_of(conn, after), on='indicator', how='outer', suffixes=('_before', '_after'))
+    diff['change'] = diff['current_after'] - diff['current_before']
+    diff['change_pct'] = diff['change'] / diff['current_before'].abs() * 100
+    return diff[['indicator', 'current_before', 'current_after', 'change', 'change_pct', 'taken_at_before', 'taken_at_after']]
 
-st.title('Econ Mirror Dashboard - July 28, 2025')
-st.set_page_config(layout="wide", initial_sidebar_state="expanded")
+def refresh_due(force=False):
+    with refresh_lock:
+        with closing(connect()) as conn:
+            empty = conn.execute("SELECT COUNT(*) FROM data").fetchone()[0] == 0
+        if empty:
+            # Cold start: publish whatever the series store can compute, left due for a real refresh
+            write_snapshot(fetch_all(refresh=False), refreshed=False)
+        names = list(indicators) if force else due_indicators()
+        if names:
+            log.info(f"Refreshing {len(names)} indicators")
+            write_snapshot(fetch_all(names=names))
+            compact_snapshots()
+        return names
+
+def run_worker(refresh_requested=None, once=False, force=False):
+    refresh_requested = refresh_requested or threading.Event()
+    while True:
+        try:
+            refresh_due(force=force or refresh_requested.is_set())
+        except Exception:
+            log.exception("Background refresh failed")
+        refresh_requested.clear()
+        force = False
+        if once:
+            return
+        refresh_requested.wait(WORKER_POLL)
+
+@st.cache_resource
+def start_worker():
+    # One worker thread per server process, shared by every session
+    refresh_requested = threading.Event()
+    threading.Thread(target=run_worker, args=(refresh_requested,), daemon=True, name='econ-refresh').start()
+    return refresh_requested
+
+# Charts: one faceted figure per page of indicators instead of one figure per indicator
+CHARTS_PER_FIGURE = 12
+CHART_COLUMNS = 3
+
+def make_figure(chunk):
+    long = chunk.melt(id_vars=['Description', 'Unit'], value_vars=['Previous', 'Current', 'Forecast'], var_name='Period', value_name='Value')
+    long['Label'] = long['Value'].astype(str) + ' ' + long['Unit']
+    rows = -(-len(chunk) // CHART_COLUMNS)
+    fig = px.bar(long, x='Period', y='Value', color='Period', text='Label', facet_col='Description', facet_col_wrap=CHART_COLUMNS,
+                 facet_row_spacing=0.3 / rows, category_orders={'Description': list(chunk['Description'])},
+                 color_discrete_sequence=['blue', 'green', 'orange'], height=250 * rows)
+    fig.update_traces(hovertemplate='Value: %{y} %{text}<extra></extra>')
+    fig.update_yaxes(matches=None, showticklabels=True, title_text='')
+    fig.update_xaxes(title_text='')
+    fig.for_each_annotation(lambda a: a.update(text=a.text.split('=', 1)[-1]))
+    fig.update_layout(showlegend=False, margin=dict(t=40, b=20))
+    return fig
+
+@st.cache_resource(max_entries=64)
+def build_figure(version, page, _chart_data):
+    # Keyed on the snapshot version; the figure object itself is shared, so reruns over unchanged data skip building and
+    # re-validating it (a cached dict is rebuilt into a validated Figure by st.plotly_chart), leaving only the JSON encoding
+    return make_figure(_chart_data.iloc[page * CHARTS_PER_FIGURE:(page + 1) * CHARTS_PER_FIGURE])
+
+def load_snapshot(conn, as_of=None):
+    # Table rows for the dashboard (latest, or as of a past snapshot time) plus a version hash of the values, or (None, None) without data
+    if as_of is None:
+        df = pd.read_sql('SELECT Indicator, Value, refreshed_at FROM data ORDER BY rowid', conn)
+    else:
+        rows = snapshot_as_of(conn, as_of)
+        df = pd.DataFrame({
+            'Indicator': rows['indicator'],
+            'Value': [json.dumps(replace_nan_with_none(values)) for values in rows[['previous', 'current', 'forecast']].astype(float).values.tolist()],
+            'refreshed_at': rows['taken_at'],
+        })
+        order = {name: i for i, name in enumerate(indicators)}
+        df = df.sort_values('Indicator', key=lambda s: s.map(order).fillna(len(order)), kind='stable').reset_index(drop=True)
+    if df.empty:
+        return None, None
+
+    # Any change to the stored values gives a new version, which keys the cached figures
+    version = hashlib.sha1('\n'.join(df['Indicator'] + '=' + df['Value'].fillna('')).encode()).hexdigest()
+    df['Value'] = df['Value'].apply(lambda x: json.loads(x) if pd.notna(x) else [None, None, None])
+
+    # Indicators that have never fetched successfully still get a row, with their failing status
+    missing = [name for name in indicators if name not in set(df['Indicator'])]
+    df = pd.concat([df, pd.DataFrame({'Indicator': missing, 'Value': [[None, None, None]] * len(missing)})], ignore_index=True)
+
+    status = {source: {'last_success': last_success, 'failures': failures} for source, last_success, failures in conn.execute('SELECT source, last_success, failures FROM source_status')}
+    sources = pd.DataFrame([source_summary(name, status) for name in df['Indicator']], columns=['Source', 'As of', 'Status'])
+    meta = pd.DataFrame.from_dict(indicators, orient='index').reindex(df['Indicator'])[['thresh', 'unit', 'desc']].fillna('N/A')
+
+    # Unpack values for display
+    df_expanded = pd.concat([
+        df[['Indicator']],
+        pd.DataFrame(df['Value'].tolist(), columns=['Previous', 'Current', 'Forecast']).astype(float),
+        meta.rename(columns={'thresh': 'Threshold', 'unit': 'Unit', 'desc': 'Description'}).reset_index(drop=True),
+        sources,
+    ], axis=1)
+    if as_of is not None:
+        # Past values are shown with the time they were taken rather than today's source health
+        df_expanded['As of'] = df['refreshed_at']
+        df_expanded['Status'] = 'snapshot'
+    return df_expanded, version
+
+def run_bench(path, runs=3, latency=0.0):
+    # Offline benchmark: cold and warm refreshes plus render work over recorded responses, each run on a fresh econ.db
+    global DB_PATH, fixture_mode, fixture_dir, fixture_latency
+    fixture_mode, fixture_dir, fixture_latency = 'replay', path, latency
+    results = []
+    for run in range(runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            DB_PATH = os.path.join(tmp, 'econ.db')
+            init_store()
+            timings = {'run': run + 1}
+            for phase in ('cold', 'warm'):
+                started = time.perf_counter()
+                write_snapshot(fetch_all())
+                timings[f'{phase}_refresh_s'] = time.perf_counter() - started
+            with closing(connect()) as conn:
+                cold = json.loads(conn.execute("SELECT stats FROM refresh_stats ORDER BY started_at LIMIT 1").fetchone()[0])
+                started = time.perf_counter()
+                df_expanded, _ = load_snapshot(conn)
+                timings['snapshot_s'] = time.perf_counter() - started
+            started = time.perf_counter()
+            for page in range(-(-len(df_expanded) // CHARTS_PER_FIGURE)):
+                make_figure(df_expanded.iloc[page * CHARTS_PER_FIGURE:(page + 1) * CHARTS_PER_FIGURE]).to_json()
+            timings['figures_s'] = time.perf_counter() - started
+            timings.update({k: cold['summary'][k] for k in ('requests', 'bytes', 'parallelism')})
+            results.append(timings)
+    return pd.DataFrame(results).set_index('run')
+
+init_store()
+
+if __name__ == '__main__' and not st.runtime.exists():
+    # Standalone worker: python app.py [--once] [--force] [--record DIR], or python app.py --bench DIR
+    parser = argparse.ArgumentParser(description='Refresh econ.db on each indicator\'s release schedule')
+    parser.add_argument('--once', action='store_true', help='refresh whatever is due and exit')
+    parser.add_argument('--force', action='store_true', help='refresh every indicator on the first pass')
+    parser.add_argument('--record', metavar='DIR', help='save every downloaded response as a fixture under DIR (implies --force)')
+    parser.add_argument('--bench', metavar='DIR', help='benchmark refresh and render against fixtures recorded in DIR')
+    parser.add_argument('--runs', type=int, default=3, help='benchmark repetitions')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to each replayed request')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    if args.bench:
+        bench = run_bench(args.bench, args.runs, args.latency)
+        print(bench.round(4).to_string())
+        print(bench.median().round(4).to_string())
+        sys.exit(0)
+    if args.record:
+        fixture_mode, fixture_dir = 'record', args.record
+    # Recording refreshes every indicator, so the fixture set covers everything --bench replays
+    run_worker(once=args.once, force=args.force or bool(args.record))
+    sys.exit(0)
+
+# Dashboard page: rendered when Streamlit runs this file, so importing it only loads the functions above
+def render_page():
+    conn = connect()
+
+    st.title('Econ Mirror Dashboard - July 28, 2025')
+    st.set_page_config(layout="wide", initial_sidebar_state="expanded")
+
+    # Set ECON_EMBEDDED_WORKER=0 when a standalone worker process keeps econ.db fresh
+    refresh_requested = start_worker() if os.environ.get('ECON_EMBEDDED_WORKER', '1') == '1' else None
+
+    if st.button('Refresh Now'):
+        if refresh_requested:
+            refresh_requested.set()
+            st.info('Refresh requested, new values appear once the background worker has finished.')
+        else:
+            st.info('Refreshes are handled by the standalone worker (python app.py --once --force).')
+
+    # Time travel: any past snapshot renders straight from econ.db
+    times = snapshot_times(conn)
+    as_of = st.sidebar.selectbox('As of', [None] + times, format_func=lambda t: 'Latest' if t is None else t)
+    compare_to = st.sidebar.selectbox('Compare with', [None] + times, format_func=lambda t: 'Nothing' if t is None else t)
 
-if st.button('Refresh Now'):
-    data = fetch_all()
-    df = pd.DataFrame([{'Indicator': name, 'Value': json.dumps(replace_nan_with_none(value))} for name, value in data.items()])
-    df.to_sql('data', conn, if_exists='replace', index=False)
-else:
     try:
-        df = pd.read_sql('SELECT * FROM data', conn)
-        df['Value'] = df['Value'].apply(lambda x: json.loads(x) if pd.notna(x) else [0, 0, 0])
+        df_expanded, version = load_snapshot(conn, as_of)
     except Exception as e:
         st.error(f"DB error: {str(e)}")
-        data = fetch_all()
-        df = pd.DataFrame([{'Indicator': name, 'Value': json.dumps(replace_nan_with_none(value))} for name, value in data.items()])
-        df.to_sql('data', conn, if_exists='replace', index=False)
-
-# Unpack values for display
-df_expanded = pd.DataFrame({
-    'Indicator': df['Indicator'],
-    'Previous': df['Value'].apply(lambda x: x[0] if isinstance(x, list) and len(x) > 0 else 0),
-    'Current': df['Value'].apply(lambda x: x[1] if isinstance(x, list) and len(x) > 1 else 0),
-    'Forecast': df['Value'].apply(lambda x: x[2] if isinstance(x, list) and len(x) > 2 else 0),
-    'Threshold': df['Indicator'].apply(lambda x: indicators.get(x, {}).get('thresh', 'N/A')),
-    'Unit': df['Indicator'].apply(lambda x: indicators.get(x, {}).get('unit', 'N/A')),
-    'Description': df['Indicator'].apply(lambda x: indicators.get(x, {}).get('desc', 'N/A'))
-})
-
-col1, col2 = st.columns(2)
-
-with col1:
-    st.subheader('Risks/Cycles Viz')
-    for index, row in df_expanded.iterrows():
-        values = [row['Previous'], row['Current'], row['Forecast']]
-        fig = px.bar(x=['Previous', 'Current', 'Forecast'], y=values, title=row['Description'],
-                     color_discrete_sequence=['blue', 'green', 'orange'])
-        fig.update_traces(hovertemplate='Value: %{y} %{text}<extra></extra>', text=[f"{v} {row['Unit']}" for v in values])
-        st.plotly_chart(fig, use_container_width=True, key=f"plotly_chart_{row['Indicator']}_{index}")
-
-with col2:
-    st.subheader('Indicators Table')
-    st.dataframe(df_expanded)
\ No newline at end of file
+        st.stop()
+
+    if df_expanded is None:
+        st.info('Waiting for the first background refresh, reload in a moment.')
+        st.stop()
+
+    pages = -(-len(df_expanded) // CHARTS_PER_FIGURE)
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.subheader('Risks/Cycles Viz')
+        page = 0
+        if pages > 1:
+            page = st.selectbox('Indicators', range(pages),
+                                format_func=lambda p: f"{p * CHARTS_PER_FIGURE + 1}-{min((p + 1) * CHARTS_PER_FIGURE, len(df_expanded))} of {len(df_expanded)}")
+        st.plotly_chart(build_figure(version, page, df_expanded), use_container_width=True, key='plotly_chart_indicators')
+
+    with col2:
+        st.subheader('Indicators Table')
+        st.dataframe(df_expanded)
+
+    with st.expander('Country comparison (World Bank)'):
+        # Latest available year per indicator and country, straight from the local panel
+        panel = pd.read_sql("""SELECT indicator, country, year, value FROM wb_panel
+                               JOIN (SELECT indicator, country, MAX(year) AS year FROM wb_panel GROUP BY indicator, country) USING (indicator, country, year)""", conn)
+        if panel.empty:
+            st.info('No World Bank data stored yet.')
+        else:
+            comparison = panel.pivot(index='indicator', columns='country', values='value')
+            comparison = comparison[[c for c in wb_scope()[1] if c in comparison.columns]]
+            comparison.index = comparison.index.map(lambda code: WB_LABELS.get(code, code))
+            st.dataframe(comparison)
+            st.caption('Countries are set with ECON_WB_COUNTRIES (comma-separated ISO codes).')
+
+    if compare_to is not None:
+        st.subheader(f"Changes from {compare_to} to {as_of or 'latest'}")
+        st.dataframe(snapshot_diff(conn, compare_to, as_of or datetime.now().isoformat(timespec='seconds')))
+
+    if st.sidebar.checkbox('Diagnostics'):
+        recent = pd.read_sql('SELECT stats FROM refresh_stats ORDER BY started_at DESC LIMIT 20', conn)['stats'].apply(json.loads)
+        if recent.empty:
+            st.sidebar.info('No refreshes recorded yet.')
+        else:
+            st.subheader('Refresh diagnostics')
+            st.dataframe(pd.DataFrame([stats['summary'] for stats in recent]))
+            latest = recent.iloc[0]
+            diag1, diag2, diag3 = st.columns(3)
+            diag1.caption('Slowest indicators (latest refresh)')
+            diag1.dataframe(pd.DataFrame.from_dict(latest['indicators'], orient='index').sort_values('seconds', ascending=False))
+            diag2.caption('Sources')
+            diag2.dataframe(pd.DataFrame.from_dict(latest['sources'], orient='index').sort_values('seconds', ascending=False))
+            diag3.caption('Hosts')
+            diag3.dataframe(pd.DataFrame.from_dict(latest['hosts'], orient='index'))
+
+if __name__ == '__main__':
+    render_page()
@@ -0,0 +1,84 @@
+import importlib.util
+import threading
+import time
+from contextlib import closing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+import requests
+
+APP = Path(__file__).resolve().parent.parent / 'app.py'
+
+
+class Handler(BaseHTTPRequestHandler):
+    # /etag serves a body with an ETag and answers 304 when it is sent back, /fail always returns 503
+    seen = []
+
+    def do_GET(self):
+        Handler.seen.append((self.path, self.headers.get('If-None-Match')))
+        if self.path == '/fail':
+            self.send_response(503)
+            self.end_headers()
+        elif self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+        else:
+            body = b'<html>v1</html>'
+            self.send_response(200)
+            self.send_header('ETag', '"v1"')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.seen = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # A fresh import per test; importing creates econ.db in the working directory and does not render the page
+    (tmp_path / '.streamlit').mkdir()
+    (tmp_path / '.streamlit' / 'secrets.toml').write_text('FRED_API_KEY = "test"\n')
+    monkeypatch.chdir(tmp_path)
+    spec = importlib.util.spec_from_file_location('app', APP)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.DB_PATH = str(tmp_path / 'econ.db')
+    return module
+
+
+def test_second_fetch_is_conditional_and_served_from_cache(app, server):
+    first = app.fetch_url(server + '/etag')
+    second = app.fetch_url(server + '/etag')
+    assert first == second == b'<html>v1</html>'
+    assert Handler.seen == [('/etag', None), ('/etag', '"v1"')]
+
+
+def test_server_error_puts_host_into_backoff(app, server):
+    with pytest.raises(requests.HTTPError):
+        app.fetch_url(server + '/fail')
+    with closing(app.connect()) as conn:
+        failures, = conn.execute("SELECT failures FROM host_status WHERE host = ?", (server.split('//')[1],)).fetchone()
+    assert failures == 1
+    with pytest.raises(app.BackoffError):
+        app.fetch_url(server + '/fail')
+    assert len(Handler.seen) == 1
+
+
+def test_fetch_after_deadline_raises_timeout(app, server, monkeypatch):
+    monkeypatch.setattr(app, 'refresh_deadline', time.monotonic() - 1)
+    with pytest.raises(TimeoutError):
+        app.fetch_url(server + '/etag')
+    assert Handler.seen == []